@@ -1,10 +1,10 @@
-import math
+import numpy as np
 
 class DummyModel:
+    _is_fast = True  # cheap enough for app.main to call inline on the event loop
+
     def predict_proba(self, X):
-        out = []
-        for row in X:
-            s = sum(float(v) for v in row)
-            p = 1 / (1 + math.exp(-s / 10))
-            out.append([1 - p, p])  # [neg, pos]
-        return out
+        X = np.asarray(X, dtype=np.float64)
+        s = X.sum(axis=1) * 0.1
+        p = 1.0 / (1.0 + np.exp(-s))
+        return np.column_stack((1.0 - p, p))  # [neg, pos]
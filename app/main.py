@@ -1,11 +1,39 @@
 from fastapi import FastAPI
-from pydantic import BaseModel, Field
-import joblib, os, uuid, time
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, field_validator
+import asyncio, joblib, os, secrets, time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
 
-app = FastAPI(title="Fraud Inference", version="v1")
+app = FastAPI(title="Fraud Inference", version="v1", default_response_class=ORJSONResponse)
 MODEL_PATH = os.getenv("MODEL_PATH", "artifacts/model.joblib")
-model = joblib.load(MODEL_PATH)
+# Opt-in: an ONNX export is only served when pointed at explicitly, so it can't shadow MODEL_PATH
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH")
+
+try:
+    from app.onnx_model import OnnxModel
+except Exception:
+    OnnxModel = None
+
+# The ONNX export skips sklearn dispatch per call; otherwise load the joblib pickle
+if ONNX_MODEL_PATH:
+    if OnnxModel is None:
+        raise RuntimeError("ONNX_MODEL_PATH is set but onnxruntime is not installed")
+    model = OnnxModel(ONNX_MODEL_PATH)
+else:
+    # mmap the pipeline's arrays so worker processes share pages and startup skips copying them
+    model = joblib.load(MODEL_PATH, mmap_mode="r")
+
+# Heavy models run on a worker pool so the event loop keeps accepting requests;
+# models flagged `_is_fast` (e.g. DummyModel) are cheaper to call inline.
+MODEL_IS_FAST = bool(getattr(model, "_is_fast", False))
+CPU_POOL = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+
+# Concurrent /predict calls arriving within this window are scored together
+BATCH_WINDOW_S = float(os.getenv("BATCH_WINDOW_MS", "5")) / 1000.0
+# Request counts are folded into PRED_COUNT this often (and on every /metrics scrape)
+COUNT_FLUSH_S = 0.1
 
 PRED_COUNT = Counter("predict_requests_total", "Predict requests")
 PRED_ERR   = Counter("predict_errors_total", "Predict errors")
@@ -15,12 +43,92 @@ class PredictIn(BaseModel):
     features: list[float] = Field(..., description="Feature vector matching training schema")
     threshold: float = 0.5
 
+class BatchIn(BaseModel):
+    features: list[list[float]] = Field(..., description="Feature vectors matching training schema")
+    threshold: float = 0.5
+
+    @field_validator("features")
+    @classmethod
+    def same_length(cls, v):
+        # ragged rows can't form a matrix; reject them as a 422 instead of failing in the model
+        if len({len(row) for row in v}) > 1:
+            raise ValueError("all feature vectors must have the same length")
+        return v
+
 class PredictOut(BaseModel):
     request_id: str
     model_version: str
     prob: float
     label: int
 
+async def _predict_proba(X):
+    if MODEL_IS_FAST:
+        return model.predict_proba(X)
+    return await asyncio.get_running_loop().run_in_executor(CPU_POOL, model.predict_proba, X)
+
+# ---------- Request counting ----------
+# Predict handlers all run on the event loop thread, so a plain int needs no lock;
+# PRED_COUNT's mutex is only taken once per flush instead of once per request.
+_pred_pending = 0
+
+def _flush_pred_count():
+    global _pred_pending
+    if _pred_pending:
+        PRED_COUNT.inc(_pred_pending)
+        _pred_pending = 0
+
+async def _pred_count_flusher():
+    while True:
+        await asyncio.sleep(COUNT_FLUSH_S)
+        _flush_pred_count()
+
+# ---------- Micro-batching ----------
+_queue = None
+_queue_loop = None
+_bg_tasks = []        # strong refs so the loop can't garbage-collect the background tasks
+_predict_inflight = 0  # /predict handlers that have started but not returned
+
+def _drain(queue, items):
+    while not queue.empty():
+        items.append(queue.get_nowait())
+
+async def _batch_worker(queue):
+    while True:
+        items = [await queue.get()]
+        _drain(queue, items)
+        # Only hold the batch open when other /predict calls are in flight; a lone
+        # request (e.g. one per Lambda container) is scored right away.
+        if _predict_inflight > len(items):
+            await asyncio.sleep(BATCH_WINDOW_S)
+            _drain(queue, items)
+        try:
+            X = np.asarray([f for f, _ in items], dtype=np.float32)
+            probs = (await _predict_proba(X))[:, 1]
+            for (_, fut), p in zip(items, probs):
+                if not fut.done():
+                    fut.set_result(float(p))
+        except Exception:
+            # e.g. mismatched vector lengths: score one by one so a bad row only fails its own request
+            for f, fut in items:
+                if fut.done():
+                    continue
+                try:
+                    prob = (await _predict_proba(np.asarray([f], dtype=np.float32)))[0, 1]
+                    fut.set_result(float(prob))
+                except Exception as e:
+                    fut.set_exception(e)
+
+def _ensure_background_tasks():
+    # (re)start the batch worker and count flusher on whichever loop is serving requests
+    global _queue, _queue_loop
+    loop = asyncio.get_running_loop()
+    if _queue_loop is not loop:
+        _queue, _queue_loop = asyncio.Queue(), loop
+        _bg_tasks[:] = [
+            loop.create_task(_batch_worker(_queue)),
+            loop.create_task(_pred_count_flusher()),
+        ]
+
 @app.get("/healthz")
 def healthz():
     return {"ok": True, "version": "v1", "has_model": model is not None}
@@ -30,18 +138,24 @@ def readyz():
     return {"ready": True}
 
 @app.get("/metrics")
-def metrics():
+async def metrics():
+    _flush_pred_count()
     return generate_latest(), 200, {"Content-Type": CONTENT_TYPE_LATEST}
 
 @app.post("/predict", response_model=PredictOut)
-def predict(body: PredictIn):
-    start = time.time()
-    PRED_COUNT.inc()
+async def predict(body: PredictIn):
+    global _pred_pending, _predict_inflight
+    start = time.perf_counter()
+    _pred_pending += 1
+    _predict_inflight += 1
     try:
-        prob = float(model.predict_proba([body.features])[0][1])
+        _ensure_background_tasks()
+        fut = asyncio.get_running_loop().create_future()
+        await _queue.put((body.features, fut))
+        prob = await fut
         label = int(prob >= body.threshold)
         return {
-            "request_id": str(uuid.uuid4()),
+            "request_id": secrets.token_hex(8),
             "model_version": "v1",
             "prob": prob,
             "label": label,
@@ -50,4 +164,32 @@ def predict(body: PredictIn):
         PRED_ERR.inc()
         raise
     finally:
-        PRED_LAT.observe(time.time() - start)
+        _predict_inflight -= 1
+        PRED_LAT.observe(time.perf_counter() - start)
+
+@app.post("/predict_batch", response_model=list[PredictOut])
+async def predict_batch(body: BatchIn):
+    global _pred_pending
+    start = time.perf_counter()
+    _pred_pending += 1
+    try:
+        _ensure_background_tasks()
+        if not body.features:
+            return []
+        X = np.asarray(body.features, dtype=np.float32)
+        probs = (await _predict_proba(X))[:, 1]
+        labels = (probs >= body.threshold).astype(np.int8)
+        return [
+            {
+                "request_id": secrets.token_hex(8),
+                "model_version": "v1",
+                "prob": float(p),
+                "label": int(l),
+            }
+            for p, l in zip(probs, labels)
+        ]
+    except Exception:
+        PRED_ERR.inc()
+        raise
+    finally:
+        PRED_LAT.observe(time.perf_counter() - start)
@@ -0,0 +1,14 @@
+import numpy as np
+import onnxruntime as ort
+
+class OnnxModel:
+    """predict_proba over the ONNX export written by train.py (runs without sklearn)."""
+
+    def __init__(self, path):
+        self.sess = ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+        self.input_name = self.sess.get_inputs()[0].name
+        self.proba_name = self.sess.get_outputs()[1].name  # outputs: [label, probabilities]
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        return self.sess.run([self.proba_name], {self.input_name: X})[0]  # [neg, pos]
@@ -0,0 +1,12 @@
+# csv_utils.py — shared CSV loading for train.py and the metrics scripts
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = "pyarrow"  # multithreaded parser
+except Exception:
+    CSV_ENGINE = "c"
+
+
+def read_csv(path, **kwargs) -> pd.DataFrame:
+    return pd.read_csv(path, engine=CSV_ENGINE, **kwargs)
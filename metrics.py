@@ -2,40 +2,52 @@
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from csv_utils import read_csv
 
 P = Path(__file__).resolve().parent
-truth = pd.read_csv(P / "data" / "creditcard.csv", usecols=["Class"]).Class.to_numpy()
-preds = pd.read_csv(P / "fraud_scores.csv", usecols=["fraud_probability","is_fraud_pred"])
+truth = read_csv(P / "data" / "creditcard.csv", usecols=["Class"]).Class.to_numpy()
+preds = read_csv(P / "fraud_scores.csv", usecols=["fraud_probability"])
 
 probs = preds["fraud_probability"].to_numpy()
 
-def metrics_at(th):
-    pred = (probs >= th).astype(int)
-    tp = ((truth==1) & (pred==1)).sum()
-    fp = ((truth==0) & (pred==1)).sum()
-    tn = ((truth==0) & (pred==0)).sum()
-    fn = ((truth==1) & (pred==0)).sum()
-    precision = tp / (tp+fp) if (tp+fp) else 0.0
-    recall    = tp / (tp+fn) if (tp+fn) else 0.0
-    f1        = (2*precision*recall)/(precision+recall) if (precision+recall) else 0.0
-    flagged   = (pred==1).sum()
-    return tp, fp, tn, fn, precision, recall, f1, flagged
-
-ths = np.concatenate([
+truth_bool = truth.astype(bool)
+n_pos = int(truth_bool.sum())
+n_neg = len(truth) - n_pos
+
+def conf_counts(ths):
+    """(T, 4) array of tp, fp, tn, fn for each threshold; ths must be sorted ascending."""
+    # One pass buckets each prob by how many thresholds it clears;
+    # a reverse cumsum over the T+1 buckets then gives the counts at every threshold.
+    cleared = np.searchsorted(ths, probs, side="right")
+    flagged = np.cumsum(np.bincount(cleared, minlength=len(ths) + 1)[::-1])[::-1][1:]
+    tp = np.cumsum(np.bincount(cleared[truth_bool], minlength=len(ths) + 1)[::-1])[::-1][1:]
+    fp = flagged - tp
+    fn = n_pos - tp
+    tn = n_neg - fp
+    return np.column_stack((tp, fp, tn, fn))
+
+def top_percentiles(a, qs):
+    """np.percentile(a, qs) for qs >= 90, selecting only the top tenth of `a` instead of all of it."""
+    k0 = int((len(a) - 1) * 0.9)
+    top = np.partition(a, k0)[k0:]  # everything at or above sorted position k0
+    pos = (len(a) - 1) * np.asarray(qs) / 100 - k0
+    return np.quantile(top, pos / max(len(top) - 1, 1))
+
+ths = np.unique(np.round(np.clip(np.concatenate([
     np.linspace(0.01, 0.99, 99),  # coarse
-    np.percentile(probs, np.linspace(90, 100, 101))  # finer near the top
-])
-rows = []
-seen = set()
-for th in np.clip(ths, 0, 1):
-    th = float(round(th, 6))
-    if th in seen: 
-        continue
-    seen.add(th)
-    tp, fp, tn, fn, p, r, f1, flagged = metrics_at(th)
-    rows.append({"threshold": th, "precision": p, "recall": r, "f1": f1, "flagged": flagged})
-
-df = pd.DataFrame(rows).sort_values("threshold")
+    top_percentiles(probs, np.linspace(90, 100, 101))  # finer near the top
+]), 0, 1), 6))
+
+counts = conf_counts(ths)
+tp, fp, tn, fn = counts.T
+flagged   = tp + fp
+precision = np.divide(tp, flagged, out=np.zeros(len(tp)), where=flagged > 0)
+recall    = np.divide(tp, tp + fn, out=np.zeros(len(tp)), where=(tp + fn) > 0)
+f1        = np.divide(2*precision*recall, precision + recall,
+                      out=np.zeros(len(tp)), where=(precision + recall) > 0)
+
+df = pd.DataFrame({"threshold": ths, "precision": precision, "recall": recall,
+                   "f1": f1, "flagged": flagged}).sort_values("threshold")
 df.to_csv("threshold_sweep.csv", index=False)
 print("Wrote threshold_sweep.csv")
 print(df.sort_values("f1", ascending=False).head(10))         # best F1
@@ -1,26 +1,33 @@
 import pandas as pd, numpy as np
 from pathlib import Path
+from csv_utils import read_csv
+
 P = Path(__file__).resolve().parent
-truth = pd.read_csv(P / "data" / "creditcard.csv", usecols=["Class"]).Class.to_numpy()
-preds = pd.read_csv(P / "fraud_scores.csv", usecols=["fraud_probability"])
+truth = read_csv(P / "data" / "creditcard.csv", usecols=["Class"]).Class.to_numpy()
+preds = read_csv(P / "fraud_scores.csv", usecols=["fraud_probability"])
 probs = preds["fraud_probability"].to_numpy()
 
-def metrics_at(th):
-    pred = (probs >= th).astype(int)
-    tp = ((truth==1) & (pred==1)).sum()
-    fp = ((truth==0) & (pred==1)).sum()
-    tn = ((truth==0) & (pred==0)).sum()
-    fn = ((truth==1) & (pred==0)).sum()
-    prec = tp / (tp+fp) if (tp+fp) else 0.0
-    rec  = tp / (tp+fn) if (tp+fn) else 0.0
-    f1   = (2*prec*rec)/(prec+rec) if (prec+rec) else 0.0
-    flagged = (pred==1).sum()
+def metrics_all(ths):
+    # ths ascending. One pass buckets each prob by how many thresholds it clears;
+    # a reverse cumsum over the T+1 buckets then gives the counts at every threshold.
+    ths = np.asarray(ths)
+    cleared = np.searchsorted(ths, probs, side="right")
+    per_bucket = np.bincount(cleared, minlength=len(ths) + 1)
+    pos_per_bucket = np.bincount(cleared[truth == 1], minlength=len(ths) + 1)
+    # counts fit in int32, which halves the bandwidth of the scans
+    flagged = np.cumsum(per_bucket[::-1], dtype=np.int32)[::-1]
+    cum_tp = np.cumsum(pos_per_bucket[::-1], dtype=np.int32)[::-1]
+    pos_total = int(cum_tp[0])
+    flagged, tp = flagged[1:], cum_tp[1:]
+    prec = np.divide(tp, flagged, out=np.zeros(len(flagged)), where=flagged > 0)
+    rec  = tp / pos_total if pos_total else np.zeros(len(flagged))
+    denom = prec + rec
+    f1   = np.divide(2*prec*rec, denom, out=np.zeros(len(flagged)), where=denom > 0)
     return prec, rec, f1, flagged
 
 ths = np.linspace(0, 1, 1000)
-rows = [{"threshold": float(th), **dict(zip(
-    ["precision","recall","f1","flagged"], metrics_at(th)))} for th in ths]
-df = pd.DataFrame(rows)
+prec, rec, f1, flagged = metrics_all(ths)
+df = pd.DataFrame({"threshold": ths, "precision": prec, "recall": rec, "f1": f1, "flagged": flagged})
 df.to_csv("threshold_sweep.csv", index=False)
 print("Wrote threshold_sweep.csv")
 print(df.sort_values("f1", ascending=False).head(10))
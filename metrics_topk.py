@@ -1,23 +1,23 @@
 # metrics_topk.py
-import pandas as pd
+import numpy as np
 from pathlib import Path
+from csv_utils import read_csv
 
 P = Path(__file__).resolve().parent
-truth = pd.read_csv(P / "data" / "creditcard.csv", usecols=["Class"])
-preds = pd.read_csv(P / "fraud_scores.csv", usecols=["fraud_probability"])
-
-df = pd.concat([truth, preds], axis=1)
-df = df.sort_values("fraud_probability", ascending=False).reset_index(drop=True)
+truth = read_csv(P / "data" / "creditcard.csv", usecols=["Class"]).to_numpy().ravel()
+probs = read_csv(P / "fraud_scores.csv", usecols=["fraud_probability"]).to_numpy().ravel()
 
 K = 1000   # <-- set the number of cases you want to flag
-df["is_fraud_pred"] = 0
-df.loc[:K-1, "is_fraud_pred"] = 1
 
-tp = ((df.Class==1) & (df.is_fraud_pred==1)).sum()
-fp = ((df.Class==0) & (df.is_fraud_pred==1)).sum()
-precision = tp / K if K else 0.0
-recall = tp / (df.Class==1).sum()
+k = min(K, len(probs))  # can't flag more cases than there are scores
+
+# partial sort: only the k highest scores are selected, the rest stay unordered
+top_idx = np.argpartition(-probs, k-1)[:k]
+tp = int(truth[top_idx].sum())
+fp = k - tp
+precision = tp / k if k else 0.0
+recall = tp / truth.sum()
 
-print(f"Top-{K} precision: {precision:.4f}  (TP={tp}, FP={fp})")
-print(f"Top-{K} recall:    {recall:.4f}")
-print(f"Implied threshold ≈ {float(df.loc[K-1, 'fraud_probability']):.6f}")
+print(f"Top-{k} precision: {precision:.4f}  (TP={tp}, FP={fp})")
+print(f"Top-{k} recall:    {recall:.4f}")
+print(f"Implied threshold ≈ {float(probs[top_idx].min()):.6f}")
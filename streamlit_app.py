@@ -1,4 +1,5 @@
 # app.py — simplified, tabbed UI with saved threshold default
+import io
 import json
 from pathlib import Path
 import numpy as np
@@ -98,24 +99,31 @@ def expected_features():
     return feats
 
 
-FEATURES = expected_features()
+# Resolved once per server instead of on every rerun
+@st.cache_resource(show_spinner=False)
+def features_and_defaults():
+    feats = expected_features()
+    defaults = (feature_stats or {}).get("defaults", {})
+    defaults_arr = np.array([float(defaults.get(c, 0.0)) for c in feats], dtype=np.float64)
+    defaults_arr.flags.writeable = False  # shared across reruns and sessions
+    return tuple(feats), defaults_arr
+
+
+FEATURES, FEATURE_DEFAULTS = features_and_defaults()
 
 
 def coerce(df: pd.DataFrame) -> pd.DataFrame:
-    cols = FEATURES
-    df = df.copy()
-    defaults = (feature_stats or {}).get("defaults", {})
-    for c in cols:
-        if c not in df.columns:
-            df[c] = float(defaults.get(c, 0.0))
-    df = df[cols]
-    for c in df.columns:
-        df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0.0)
-    return df
+    # fill one contiguous block column by column instead of mutating a DataFrame copy
+    arr = np.empty((len(df), len(FEATURES)), dtype=np.float64)
+    for i, c in enumerate(FEATURES):
+        if c in df.columns:
+            arr[:, i] = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64, na_value=0.0)
+        else:
+            arr[:, i] = FEATURE_DEFAULTS[i]
+    return pd.DataFrame(arr, columns=FEATURES, index=df.index)
 
 
-def score(df: pd.DataFrame, threshold: float) -> pd.DataFrame:
-    X = coerce(df)
+def predict_fraud_proba(X: pd.DataFrame) -> np.ndarray:
     proba = None
     if hasattr(model, "predict_proba"):
         try:
@@ -130,12 +138,30 @@ def score(df: pd.DataFrame, threshold: float) -> pd.DataFrame:
             proba = None
     if proba is None and hasattr(model, "predict"):
         proba = model.predict(X).astype(float)
+    return proba
+
+
+def apply_threshold(X: pd.DataFrame, proba: np.ndarray, threshold: float) -> pd.DataFrame:
     out = X.copy()
     out["fraud_probability"] = proba
     out["is_fraud_pred"] = (out["fraud_probability"] >= threshold).astype(int)
     return out
 
 
+def score(df: pd.DataFrame, threshold: float) -> pd.DataFrame:
+    X = coerce(df)
+    return apply_threshold(X, predict_fraud_proba(X), threshold)
+
+
+# Keyed on the upload's file_id only (the underscore keeps Streamlit from hashing the bytes),
+# so neither reruns nor threshold changes re-score. Each entry holds a whole coerced upload,
+# so only the last few are kept.
+@st.cache_data(show_spinner=False, max_entries=3)
+def score_proba_csv(file_id: str, _csv_bytes: bytes):
+    X = coerce(pd.read_csv(io.BytesIO(_csv_bytes)))
+    return X, predict_fraud_proba(X)
+
+
 #  Header & controls 
 st.markdown("## 💳 Credit Card Fraud Detector")
 
@@ -172,7 +198,7 @@ with tabs[0]:
     time = q2.number_input("Time (seconds since first txn)", min_value=0.0, value=10_000.0, step=100.0)
 
     # Build a single-row frame using defaults
-    base = {c: (feature_stats["defaults"].get(c, 0.0) if has_stats else 0.0) for c in FEATURES}
+    base = dict(zip(FEATURES, FEATURE_DEFAULTS.tolist()))
     base["Amount"] = float(amt)
     if "Time" in base:
         base["Time"] = float(time)
@@ -185,7 +211,7 @@ with tabs[0]:
         st.success(f"Fraud probability: **{prob:.3f}**  •  Prediction: {'🚩 FRAUD' if label==1 else '✅ LEGIT'}")
 
         st.markdown("**Scored row (features shown after coercion):**")
-        st.dataframe(res[FEATURES + ["fraud_probability", "is_fraud_pred"]], use_container_width=True)
+        st.dataframe(res[[*FEATURES, "fraud_probability", "is_fraud_pred"]], use_container_width=True)
 
     with st.expander("Need full control? (advanced form)"):
         st.write("This builds inputs for **all features** from your `feature_stats.json` ranges.")
@@ -214,7 +240,7 @@ with tabs[0]:
                 prob = float(res.loc[0, "fraud_probability"])
                 label = int(res.loc[0, "is_fraud_pred"])
                 st.success(f"Fraud probability: **{prob:.3f}**  •  Prediction: {'🚩 FRAUD' if label==1 else '✅ LEGIT'}")
-                st.dataframe(res[FEATURES + ["fraud_probability", "is_fraud_pred"]], use_container_width=True)
+                st.dataframe(res[[*FEATURES, "fraud_probability", "is_fraud_pred"]], use_container_width=True)
 
 #  Batch CSV
 with tabs[1]:
@@ -224,28 +250,48 @@ with tabs[1]:
         "Extras are dropped; missing numeric columns are filled from defaults or 0.0."
     )
     csv = st.file_uploader("Upload CSV", type=["csv"])
+    csv_key = csv.file_id if csv else None
     if st.button("Run Prediction on CSV"):
         if not csv:
             st.warning("Please upload a CSV first.")
-        else:
+        elif st.session_state.get("scored_key") != csv_key:
             try:
-                df = pd.read_csv(csv)
-                scored = score(df, threshold)
-                flagged = int((scored["fraud_probability"] >= threshold).sum())
-                st.metric("Flagged (≥ threshold)", value=flagged)
-                topk = int(st.session_state.get("topk", 20))
-                st.dataframe(
-                    scored.sort_values("fraud_probability", ascending=False).head(topk),
-                    use_container_width=True,
+                _, proba = score_proba_csv(csv_key, csv.getvalue())
+                # ranking doesn't depend on the threshold, so sort once per upload;
+                # X stays only in score_proba_csv's bounded cache
+                st.session_state.scored = (proba, np.argsort(-proba, kind="stable"))
+                st.session_state.scored_key = csv_key
+            except Exception as e:
+                st.error(f"Could not score CSV: {e}")
+
+    # Results stay up for the scored upload; moving the slider only re-applies the threshold
+    if csv_key is not None and st.session_state.get("scored_key") == csv_key:
+        try:
+            proba, order = st.session_state.scored
+            X, _ = score_proba_csv(csv_key, csv.getvalue())  # cache hit
+            flagged = int(np.count_nonzero(proba >= threshold))
+            st.metric("Flagged (≥ threshold)", value=flagged)
+            topk = int(st.session_state.get("topk", 20))
+            top = order[:topk]
+            st.dataframe(apply_threshold(X.iloc[top], proba[top], threshold), use_container_width=True)
+            # Writing every row to CSV is slow for big uploads, so only do it when asked
+            if st.button("Prepare CSV download"):
+                st.session_state.download = (
+                    (csv_key, threshold),
+                    apply_threshold(X, proba, threshold).to_csv(index=False).encode("utf-8"),
                 )
+            download = st.session_state.get("download")
+            if download is not None and download[0] == (csv_key, threshold):
                 st.download_button(
                     "⬇️ Download all results (CSV)",
-                    data=scored.to_csv(index=False).encode("utf-8"),
+                    data=download[1],
                     file_name="fraud_scores.csv",
                     mime="text/csv",
                 )
-            except Exception as e:
-                st.error(f"Could not score CSV: {e}")
+            elif download is not None:
+                del st.session_state["download"]  # stale: different upload or threshold
+        except Exception as e:
+            st.error(f"Could not score CSV: {e}")
 
 # JSON Row 
 with tabs[2]:
@@ -257,6 +303,6 @@ with tabs[2]:
         try:
             obj = json.loads(jtxt)
             scored = score(pd.DataFrame([obj]), threshold)
-            st.dataframe(scored[FEATURES + ["fraud_probability", "is_fraud_pred"]], use_container_width=True)
+            st.dataframe(scored[[*FEATURES, "fraud_probability", "is_fraud_pred"]], use_container_width=True)
         except Exception as e:
             st.error(f"Invalid JSON: {e}")
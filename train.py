@@ -5,15 +5,23 @@ import sys, json, traceback
 print("=== train.py starting ===", flush=True)
 
 try:
-    import joblib, pandas as pd
+    import joblib, numpy as np, pandas as pd
     from sklearn.model_selection import train_test_split
     from sklearn.linear_model import LogisticRegression
     from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
     from sklearn.metrics import classification_report, roc_auc_score
+    from csv_utils import read_csv
 except Exception as e:
     print("ERROR: Failed importing libraries:", e, file=sys.stderr, flush=True)
     raise
 
+try:
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+except Exception:
+    convert_sklearn = None
+
 PROJECT_DIR = Path(__file__).resolve().parent
 DATA_PATH = PROJECT_DIR / "data" / "creditcard.csv"
 ARTIFACTS_DIR = PROJECT_DIR / "artifacts"
@@ -22,23 +30,34 @@ ARTIFACTS_DIR.mkdir(exist_ok=True)
 def save_feature_stats(X_train: pd.DataFrame, out_path: Path):
     print(f"[save_feature_stats] columns={len(X_train.columns)}", flush=True)
     num_cols = X_train.columns.tolist()
+    # one pass over the matrix for all three quantiles instead of per-column pandas calls
+    lo, med, hi = np.percentile(X_train.to_numpy(dtype=np.float64), [1, 50, 99], axis=0)
     stats = {
         "feature_order": num_cols,
-        "defaults": X_train[num_cols].median(numeric_only=True).to_dict(),
+        "defaults": dict(zip(num_cols, med.tolist())),
         "input_ranges": {
-            c: [
-                float(X_train[c].quantile(0.01)),
-                float(X_train[c].quantile(0.99)),
-            ] for c in num_cols
+            c: [float(lo[i]), float(hi[i])] for i, c in enumerate(num_cols)
         },
     }
     with open(out_path, "w") as f:
         json.dump(stats, f, indent=2)
     print(f"[save_feature_stats] wrote -> {out_path}", flush=True)
 
+def export_onnx(clf, n_features: int, out_path: Path):
+    if convert_sklearn is None:
+        print("[export_onnx] skl2onnx not installed; skipping ONNX export", flush=True)
+        return
+    onx = convert_sklearn(
+        clf,
+        initial_types=[("X", FloatTensorType([None, n_features]))],
+        options={"zipmap": False},  # plain (N, 2) probability tensor instead of a list of dicts
+    )
+    out_path.write_bytes(onx.SerializeToString())
+    print(f"[export_onnx] wrote -> {out_path}", flush=True)
+
 def train_with_dataset():
     print(f"[train_with_dataset] reading CSV: {DATA_PATH}", flush=True)
-    df = pd.read_csv(DATA_PATH)  # will raise if not found
+    df = read_csv(DATA_PATH)  # will raise if not found
     print(f"[train_with_dataset] df shape = {df.shape}", flush=True)
     assert "Class" in df.columns, "CSV missing 'Class' label column"
     X = df.drop(columns=["Class"])
@@ -49,14 +68,19 @@ def train_with_dataset():
     )
     print(f"[split] X_train={X_train.shape}, X_valid={X_valid.shape}", flush=True)
 
+    # saga converges fast on standardized inputs, so it needs far fewer iterations than lbfgs
     clf = Pipeline([
-        ("model", LogisticRegression(max_iter=2000, class_weight="balanced"))
+        ("sc", StandardScaler()),
+        ("model", LogisticRegression(solver="saga", class_weight="balanced",
+                                     max_iter=200, tol=1e-3)),
     ])
-    print("[fit] training LogisticRegression...", flush=True)
-    clf.fit(X_train, y_train)
+    print("[fit] training LogisticRegression (saga)...", flush=True)
+    # float32 halves memory traffic for the solver; precision is plenty for these features.
+    # Only the model sees the cast: feature_stats.json is computed from the float64 split.
+    clf.fit(X_train.astype(np.float32), y_train)
 
     print("[eval] evaluating...", flush=True)
-    y_prob = clf.predict_proba(X_valid)[:, 1]
+    y_prob = clf.predict_proba(X_valid.astype(np.float32))[:, 1]
     y_pred = (y_prob >= 0.5).astype(int)
     print("ROC AUC:", roc_auc_score(y_valid, y_prob), flush=True)
     print(classification_report(y_valid, y_pred, digits=4), flush=True)
@@ -64,13 +88,13 @@ def train_with_dataset():
     model_path = ARTIFACTS_DIR / "model.joblib"
     joblib.dump(clf, model_path)
     print(f"[save] model -> {model_path}", flush=True)
+    export_onnx(clf, X_train.shape[1], ARTIFACTS_DIR / "model.onnx")
 
     stats_path = ARTIFACTS_DIR / "feature_stats.json"
     save_feature_stats(X_train, stats_path)
 
 def make_demo_artifacts():
     print("[demo] dataset not found; building DEMO artifacts...", flush=True)
-    import numpy as np
     cols = ["Time"] + [f"V{i}" for i in range(1,29)] + ["Amount"]
     n = 5000
     X = pd.DataFrame(np.random.normal(size=(n, len(cols))), columns=cols)
@@ -80,6 +104,7 @@ def make_demo_artifacts():
     clf = LogisticRegression(max_iter=1000)
     clf.fit(X, y)
     joblib.dump(clf, ARTIFACTS_DIR / "model.joblib")
+    export_onnx(clf, X.shape[1], ARTIFACTS_DIR / "model.onnx")
     save_feature_stats(X, ARTIFACTS_DIR / "feature_stats.json")
     print("[demo] wrote demo model + stats", flush=True)
 